@@ -1,38 +1,71 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+
 import dash
 from dash import dcc, html
-import plotly.express as px
+from flask import Response, abort
+import plotly
+import plotly.io as pio
 import pandas as pd
 
-# Load the combined DataFrame
-df = pd.read_csv('combined_feature_importance.csv')
+CSV_PATH = Path('combined_feature_importance.csv')
+# Serialized figures are cached next to the CSV, keyed by its mtime and size.
+# The version covers this file's source and the libraries that shape the output
+# (every figure embeds Plotly's default template), so edits invalidate it.
+_CACHE = Path('combined_feature_importance.figures.json')
+_CACHE_VERSION = '-'.join([
+    hashlib.sha256(Path(__file__).read_bytes()).hexdigest(),
+    f'plotly{plotly.__version__}',
+    f'pandas{pd.__version__}',
+])
+# Only these columns feed the pivots; typing them up front skips dtype inference
+_DTYPES = {
+    'Feature': 'category',
+    'Duration': 'int32',
+    'Normalized_Importance': 'float32',
+    'Type': 'category',
+}
 
 # Initialize the Dash app
 app = dash.Dash(__name__)
 server = app.server
 
-# Prepare data by type
-def prepare_data(df, type_label):
-    # Filter DataFrame by the specified type
-    df_filtered = df[df['Type'] == type_label]
-    # Create pivot table
-    pivot_df = df_filtered.pivot_table(
-        values='Normalized_Importance', index='Duration', columns='Feature', aggfunc='sum')
+# Prepare data for a single type, given the rows already split off for it
+def prepare_data(df_filtered):
+    # Sum importances per (Duration, Feature) and spread features into columns
+    pivot_df = (df_filtered.groupby(['Duration', 'Feature'], observed=True)['Normalized_Importance']
+                .sum()
+                .unstack('Feature', fill_value=0))
+    # Order features by name whatever order the reader assigned their category codes in
+    pivot_df.columns = pivot_df.columns.astype(str)
+    pivot_df = pivot_df.sort_index(axis=1)
     # Filter out columns where all values are zero
-    pivot_df = pivot_df.loc[:, (pivot_df != 0).any(axis=0)]
+    pivot_df = pivot_df.loc[:, pivot_df.to_numpy().any(axis=0)]
     return pivot_df
 
-# Create Plotly Express graphs for each type
+# Create a stacked area figure for each type, built as a plain dict so
+# Plotly Express doesn't melt the pivot and validate every trace
 def create_figure(data, title):
-    fig = px.area(data, title=title)
-    fig.update_layout(
-        title={'text': title, 'font': {'size': 22}},
-        xaxis_title={'text': 'Time of Heater Profile (seconds)', 'font': {'size': 18}},
-        yaxis_title={'text': 'Normalized Importance', 'font': {'size': 18}},
-        legend={'font': {'size': 15}},
-        xaxis={'tickfont': {'size': 14}},
-        yaxis={'tickfont': {'size': 14}}
-    )
-    return fig
+    x = data.index.to_numpy()
+    values = data.to_numpy()
+    traces = [
+        {'type': 'scatter', 'x': x, 'y': values[:, k], 'mode': 'lines',
+         'stackgroup': 'one', 'name': str(feature),
+         'hovertemplate': f'Feature={feature}<br>Duration=%{{x}}<br>value=%{{y}}<extra></extra>'}
+        for k, feature in enumerate(data.columns)
+    ]
+    layout = {
+        'template': pio.templates[pio.templates.default],
+        'title': {'text': title, 'font': {'size': 22}},
+        'xaxis': {'title': {'text': 'Time of Heater Profile (seconds)', 'font': {'size': 18}},
+                  'tickfont': {'size': 14}},
+        'yaxis': {'title': {'text': 'Normalized Importance', 'font': {'size': 18}},
+                  'tickfont': {'size': 14}},
+        'legend': {'title': {'text': 'Feature'}, 'font': {'size': 15}},
+    }
+    return {'data': traces, 'layout': layout}
 types = ['IBS_R', 'IBS_N', 'IBS_T', 'OBS_R', 'OBS_N', 'OBS_T']
 
 # Define a function to map types to more descriptive titles
@@ -51,15 +84,78 @@ def get_custom_title(type_label):
     
     return f'{label_type} along {direction}'
 
-# Create figures with custom titles
-figures = [create_figure(prepare_data(df, type_label), f'Normalized Feature Importance of Heater Profiles for : {get_custom_title(type_label)}') for type_label in types]
+# Read the importance CSV, using pyarrow's multithreaded block parser when it is installed
+def read_importance(csv_path):
+    try:
+        import pyarrow as pa
+        import pyarrow.csv as pacsv
+    except ImportError:
+        df = pd.read_csv(csv_path, engine='c', usecols=list(_DTYPES), dtype=_DTYPES)
+    else:
+        # Dictionary-encoded columns arrive in pandas as category without an astype pass
+        column_types = {
+            'Feature': pa.dictionary(pa.int32(), pa.string()),
+            'Duration': pa.int32(),
+            'Normalized_Importance': pa.float32(),
+            'Type': pa.dictionary(pa.int32(), pa.string()),
+        }
+        table = pacsv.read_csv(
+            csv_path,
+            read_options=pacsv.ReadOptions(use_threads=True, block_size=1 << 26),
+            convert_options=pacsv.ConvertOptions(include_columns=list(_DTYPES), column_types=column_types))
+        df = table.to_pandas()
+    # Zero rows can't contribute to any pivot cell. Importances are normalized to
+    # sum to 1 per (Type, Duration), so this never drops a Duration from a pivot.
+    df = df[df['Normalized_Importance'].to_numpy() != 0]
+    # Features that were zero everywhere are dropped entirely
+    df['Feature'] = df['Feature'].cat.remove_unused_categories()
+    return df
 
-# Define the layout of the app to include a graph for each type
-app.layout = html.Div([dcc.Graph(figure=fig) for fig in figures])
+# Load the serialized figures from the cache, rebuilding them from the CSV on a miss.
+# A warm start skips the pivoting and Plotly figure building entirely.
+def load_figures(csv_path, types):
+    stat = csv_path.stat()
+    key = [_CACHE_VERSION, stat.st_mtime, stat.st_size]
+    try:
+        with _CACHE.open(encoding='utf-8') as f:
+            cached = json.load(f)
+        if cached['key'] == key:
+            return cached['figures']
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+
+    df = read_importance(csv_path)
+    # Split by type in one hashed pass instead of one boolean scan per type
+    groups = dict(list(df.groupby('Type', sort=False, observed=True)))
+    # Serialize each figure once so Dash doesn't walk the Figure object per request
+    figures = {}
+    for type_label in types:
+        title = f'Normalized Feature Importance of Heater Profiles for : {get_custom_title(type_label)}'
+        figures[type_label] = pio.to_json(create_figure(prepare_data(groups[type_label]), title), validate=False)
+    # Write then rename so concurrently starting workers never read a partial file
+    tmp = _CACHE.with_name(f'{_CACHE.name}.{os.getpid()}.tmp')
+    try:
+        with tmp.open('w', encoding='utf-8') as f:
+            json.dump({'key': key, 'figures': figures}, f)
+        os.replace(tmp, _CACHE)
+    except OSError:
+        # A read-only checkout still serves, it just rebuilds on every start
+        tmp.unlink(missing_ok=True)
+    return figures
+
+figure_json = load_figures(CSV_PATH, types)
+
+# Serve the prebuilt figure JSON as-is for clients that fetch it directly
+@server.route('/figs/<type_label>')
+def serve_figure(type_label):
+    if type_label not in figure_json:
+        abort(404)
+    return Response(figure_json[type_label], mimetype='application/json')
 
 # Define the layout of the app to include a graph for each type
-app.layout = html.Div([dcc.Graph(figure=fig) for fig in figures])
+app.layout = html.Div([dcc.Graph(figure=json.loads(figure_json[type_label])) for type_label in types])
 
 # Run the server
 if __name__ == '__main__':
-    app.run_server(debug=True, port=8071)
+    # The reloader imports the module twice, so keep it opt-in via DASH_DEBUG=1
+    app.run_server(debug=os.getenv('DASH_DEBUG') == '1', port=8071)